@@ -1,144 +1,245 @@
-from collections import Counter, deque
+from array import array
+from collections import Counter, defaultdict, deque
 import random
-import matplotlib.pyplot as plt
-from typing import List, Dict, Optional
+import sys
+import numpy as np
+from typing import List, Dict, Final, Optional
 
 class RPSLSState:
-    MOVES = ['rock', 'paper', 'scissors', 'lizard', 'spock']
+    MOVES: Final = ('rock', 'paper', 'scissors', 'lizard', 'spock')
     
-    WINS_AGAINST = {
-        'rock': ['scissors', 'lizard'],
-        'paper': ['rock', 'spock'],
-        'scissors': ['paper', 'lizard'],
-        'lizard': ['paper', 'spock'],
-        'spock': ['rock', 'scissors']
+    WINS_AGAINST: Final = {
+        'rock': ('scissors', 'lizard'),
+        'paper': ('rock', 'spock'),
+        'scissors': ('paper', 'lizard'),
+        'lizard': ('paper', 'spock'),
+        'spock': ('rock', 'scissors')
     }
     
     def __init__(self):
-        self.player_history = []
-        self.opponent_history = []
+        # Moves are stored as indices into MOVES
+        self.player_history = array('b')
+        self.opponent_history = array('b')
+        self.last_opponent_move: Optional[int] = None
     
-    def get_result(self, move1: str, move2: str) -> int:
-        if move1 == move2:
-            return 0  # Draw
-        elif move2 in self.WINS_AGAINST[move1]:
-            return 1  # Win
-        else:
-            return -1  # Loss
+    def get_result(self, move1: int, move2: int) -> int:
+        # 1 = Win, 0 = Draw, -1 = Loss
+        return RESULT[move1][move2]
+
+# Integer encoding of the moves, precomputed from the rules above
+MOVE_IDX = {move: i for i, move in enumerate(RPSLSState.MOVES)}
+NUM_MOVES = len(RPSLSState.MOVES)
+# RESULT[i][j] is the outcome of move i played against move j
+RESULT = tuple(
+    tuple(0 if i == j else 1 if m2 in RPSLSState.WINS_AGAINST[m1] else -1
+          for j, m2 in enumerate(RPSLSState.MOVES))
+    for i, m1 in enumerate(RPSLSState.MOVES))
+# COUNTERS[i] holds the two moves that beat move i
+COUNTERS = tuple(
+    tuple(MOVE_IDX[m] for m in RPSLSState.MOVES
+          if move in RPSLSState.WINS_AGAINST[m])
+    for move in RPSLSState.MOVES)
+
+# Bound once for the hot path; still draws from the shared generator so
+# random.seed() keeps games reproducible
+_randrange = random.randrange
+_getrandbits = random.getrandbits
+
+# Largest window (5**8 patterns) that gets a flat pattern_cache table
+MAX_PATTERN_SLOTS = NUM_MOVES ** 8
+
+def _random_moves(n: int) -> List[int]:
+    # A single move (play_round) isn't worth setting up a NumPy generator
+    if n == 1:
+        return [_randrange(NUM_MOVES)]
+    # Seeded from the shared generator so random.seed() still applies
+    rng = np.random.default_rng(random.getrandbits(64))
+    return rng.integers(NUM_MOVES, size=n, dtype=np.int8).tolist()
 
 class PatternDetector:
     def __init__(self, window_size: int = 3, frequency_threshold: float = 0.3):
-        self.window_size = window_size
-        self.frequency_threshold = frequency_threshold
         # Keep last 50 moves for pattern analysis
         self.move_history = deque(maxlen=50)  
-        # Cache detected patterns
-        self.pattern_cache: Dict[str, str] = {}  
+        # A pattern needs at least one following move within the history
+        if not 1 <= window_size < self.move_history.maxlen:
+            raise ValueError(f"window_size must be between 1 and "
+                             f"{self.move_history.maxlen - 1}, got {window_size}")
+        self.window_size = window_size
+        self.frequency_threshold = frequency_threshold
+        # Running count of each move within move_history
+        self.move_counts = Counter()
+        # The last window_size moves as a base-5 number, i.e. the current pattern
+        self._num_patterns = NUM_MOVES ** window_size
+        self._window_hash = 0
+        # Moves seen after each pattern within move_history
+        self.ngram_next: Dict[int, Counter] = defaultdict(Counter)
+        # (pattern, next move) pairs in history order, oldest first
+        self._occurrences = deque()
+        # Cache detected patterns. Narrow windows get one slot per possible
+        # pattern, so the table never grows; wide windows have too many
+        # patterns for that and keep one entry per pattern in move_history.
+        self._flat_cache = self._num_patterns <= MAX_PATTERN_SLOTS
+        if self._flat_cache:
+            self.pattern_cache = [None] * self._num_patterns
+        else:
+            self.pattern_cache = {}
+        
+    def add_move(self, move: int):
+        # Drop the oldest pattern occurrence once it leaves the history
+        if len(self.move_history) == self.move_history.maxlen:
+            self._forget(*self._occurrences.popleft())
+            self.move_counts[self.move_history[0]] -= 1
+        
+        if len(self.move_history) >= self.window_size:
+            key = self._window_hash
+            self.ngram_next[key][move] += 1
+            self._uncache(key)
+            self._occurrences.append((key, move))
         
-    def add_move(self, move: str):
         self.move_history.append(move)
+        self.move_counts[move] += 1
+        self._window_hash = (self._window_hash * NUM_MOVES + move) % self._num_patterns
+        
+    def _forget(self, key: int, move: int):
+        next_moves = self.ngram_next[key]
+        count = next_moves[move] - 1
+        if count:
+            next_moves[move] = count
+        else:
+            del next_moves[move]
+            if not next_moves:
+                del self.ngram_next[key]
+        self._uncache(key)
+        
+    def _uncache(self, key: int):
+        if self._flat_cache:
+            self.pattern_cache[key] = None
+        else:
+            self.pattern_cache.pop(key, None)
         
-    def get_pattern_prediction(self) -> Optional[str]:
+    def get_pattern_prediction(self) -> Optional[int]:
         if len(self.move_history) < self.window_size:
             return None
             
-        # Convert recent moves to a string for pattern matching
-        recent_moves = list(self.move_history)[-self.window_size:]
-        pattern_key = ''.join(recent_moves)
+        # Use the recent moves as the key for pattern matching
+        pattern_key = self._window_hash
         
         # Check cache first
-        if pattern_key in self.pattern_cache:
-            return self.pattern_cache[pattern_key]
+        if self._flat_cache:
+            prediction = self.pattern_cache[pattern_key]
+        else:
+            prediction = self.pattern_cache.get(pattern_key)
+        if prediction is not None:
+            return prediction
             
-        # Look for this pattern in history
-        pattern_occurrences = []
-        for i in range(len(self.move_history) - self.window_size):
-            window = list(self.move_history)[i:i + self.window_size]
-            if window == recent_moves and i + self.window_size < len(self.move_history):
-                pattern_occurrences.append(list(self.move_history)[i + self.window_size])
-        
-        if pattern_occurrences:
-            prediction = Counter(pattern_occurrences).most_common(1)[0][0]
+        # Look up what followed this pattern in history
+        next_moves = self.ngram_next.get(pattern_key)
+        if next_moves:
+            prediction = max(next_moves, key=next_moves.__getitem__)
+            best = next_moves[prediction]
+            if list(next_moves.values()).count(best) > 1:
+                # Break ties by first occurrence within the current history
+                for key, move in self._occurrences:
+                    if key == pattern_key and next_moves[move] == best:
+                        prediction = move
+                        break
             self.pattern_cache[pattern_key] = prediction
             return prediction
         return None
 
-    def get_frequency_bias(self) -> Optional[str]:
+    def get_frequency_bias(self) -> Optional[int]:
         if not self.move_history:
             return None
             
-        move_counts = Counter(self.move_history)
         total_moves = len(self.move_history)
         
-        for move, count in move_counts.items():
-            if count / total_moves >= self.frequency_threshold:
+        biased = [move for move, count in self.move_counts.items()
+                  if count / total_moves >= self.frequency_threshold]
+        if len(biased) <= 1:
+            return biased[0] if biased else None
+        
+        # Several moves qualify; the earliest one in the history wins
+        for move in self.move_history:
+            if move in biased:
                 return move
-        return None
 
 class RPSLSGame:
     def __init__(self):
         self.state = RPSLSState()
         self.pattern_detector = PatternDetector()
+        # Opponent's last 5 moves and how often each move appears in them
+        self._recent5 = deque(maxlen=5)
+        self._recent5_counts = [0] * NUM_MOVES
         
-    def get_counter_move(self, move: str) -> str:
+    def get_counter_move(self, move: int) -> int:
         """Returns a move that beats the given move"""
-        possible_counters = [m for m in RPSLSState.MOVES 
-                           if move in RPSLSState.WINS_AGAINST[m]]
-        return random.choice(possible_counters)
+        # Each move has exactly two counters, so one random bit picks one
+        return COUNTERS[move][_getrandbits(1)]
         
-    def get_ai_move(self) -> str:
+    def get_ai_move(self) -> int:
         # First check for patterns
         pattern_prediction = self.pattern_detector.get_pattern_prediction()
-        if pattern_prediction:
+        if pattern_prediction is not None:
             return self.get_counter_move(pattern_prediction)
             
         # Then check for frequency bias
         frequency_bias = self.pattern_detector.get_frequency_bias()
-        if frequency_bias:
+        if frequency_bias is not None:
             return self.get_counter_move(frequency_bias)
             
         # If no patterns detected, use recent history analysis
-        if self.state.opponent_history:
-            recent_moves = Counter(self.state.opponent_history[-5:])
-            most_common = recent_moves.most_common(1)[0][0]
+        if self._recent5:
+            most_common = max(self._recent5, key=self._recent5_counts.__getitem__)
             return self.get_counter_move(most_common)
             
         # Fallback to random
-        return random.choice(RPSLSState.MOVES)
+        return _randrange(NUM_MOVES)
+        
+    def get_opponent_moves(self, rounds: int, 
+                           opponent_strategy: str = "random", 
+                           custom_moves: List[int] = None, 
+                           start: int = 0) -> List[int]:
+        """Returns the opponent's next moves for the given strategy, reading
+        custom moves from index start. None of the strategies react to the AI,
+        so they are drawn up front."""
+        last_move = self.state.last_opponent_move
+        if opponent_strategy == "repeating":
+            move = last_move if last_move is not None else _randrange(NUM_MOVES)
+            return [move] * rounds
+        if opponent_strategy == "cycling":
+            first = last_move + 1 if last_move is not None else 0
+            if rounds == 1:
+                return [first % NUM_MOVES]
+            return ((np.arange(rounds) + first) % NUM_MOVES).tolist()
+        
+        moves = []
+        if opponent_strategy == "custom" and custom_moves:
+            moves = list(custom_moves[start:start + rounds])
+        if len(moves) < rounds:
+            moves.extend(_random_moves(rounds - len(moves)))
+        return moves
         
     def play_round(self, opponent_strategy: str = "random", 
-                  custom_moves: List[str] = None, 
+                  custom_moves: List[int] = None, 
                   round_number: int = 0) -> tuple:
       
         # Get opponent's move
-        if opponent_strategy == "random":
-            opponent_move = random.choice(RPSLSState.MOVES)
-        elif opponent_strategy == "repeating":
-            opponent_move = (self.state.opponent_history[-1] 
-                           if self.state.opponent_history 
-                           else random.choice(RPSLSState.MOVES))
-        elif opponent_strategy == "cycling":
-            moves = RPSLSState.MOVES
-            if self.state.opponent_history:
-                last_move = self.state.opponent_history[-1]
-                idx = (moves.index(last_move) + 1) % len(moves)
-            else:
-                idx = 0
-            opponent_move = moves[idx]
-        elif opponent_strategy == "custom":
-            if custom_moves and round_number < len(custom_moves):
-                opponent_move = custom_moves[round_number]
-            else:
-                opponent_move = random.choice(RPSLSState.MOVES)
-        else:
-            opponent_move = random.choice(RPSLSState.MOVES)
-            
+        opponent_move = self.get_opponent_moves(1, opponent_strategy, 
+                                                custom_moves, round_number)[0]
+        return self.play_move(opponent_move)
+        
+    def play_move(self, opponent_move: int) -> tuple:
         # Update pattern detector and get AI move
         self.pattern_detector.add_move(opponent_move)
         ai_move = self.get_ai_move()
         
         # Update histories
         self.state.opponent_history.append(opponent_move)
+        self.state.last_opponent_move = opponent_move
+        if len(self._recent5) == self._recent5.maxlen:
+            self._recent5_counts[self._recent5[0]] -= 1
+        self._recent5.append(opponent_move)
+        self._recent5_counts[opponent_move] += 1
         self.state.player_history.append(ai_move)
         
         result = self.state.get_result(ai_move, opponent_move)
@@ -146,15 +247,13 @@ class RPSLSGame:
         return ai_move, opponent_move, result
 
 def plot_cumulative_win_rate(results: List[int]):
-    wins = 0
-    win_rates = []
-    for i, result in enumerate(results):
-        if result == 1:
-            wins += 1
-        win_rate = wins / (i + 1)
-        win_rates.append(win_rate)
+    # Imported here so simulations don't pay for loading matplotlib
+    import matplotlib.pyplot as plt
+    results = np.asarray(results, dtype=np.int8)
+    rounds = np.arange(1, results.size + 1)
+    win_rates = np.cumsum(results == 1, dtype=np.int64) / rounds
     plt.figure(figsize=(10, 6))
-    plt.plot(range(1, len(results) + 1), win_rates)
+    plt.plot(rounds, win_rates)
     plt.xlabel('Number of Rounds')
     plt.ylabel('Cumulative Win Rate')
     plt.title('AI Cumulative Win Rate Over Time')
@@ -163,9 +262,12 @@ def plot_cumulative_win_rate(results: List[int]):
     plt.close()
 
 def plot_result_distribution(results: List[int]):
-    counts = Counter(results)
+    # Imported here so simulations don't pay for loading matplotlib
+    import matplotlib.pyplot as plt
+    # Shift {-1, 0, 1} to bins {0, 1, 2}, then order as wins, draws, losses
+    counts = np.bincount(np.asarray(results, dtype=np.int8) + 1, minlength=3)
     labels = ['Wins', 'Draws', 'Losses']
-    values = [counts[1], counts[0], counts[-1]]
+    values = counts[[2, 1, 0]]
     plt.figure(figsize=(8, 6))
     plt.bar(labels, values, color=['green', 'gray', 'red'])
     plt.xlabel('Results')
@@ -175,29 +277,49 @@ def plot_result_distribution(results: List[int]):
     plt.savefig('result_distribution.png')
     plt.close()
 
+def _round_lines(game: RPSLSGame, results: array):
+    wins = 0
+    rounds_played = zip(game.state.player_history, 
+                        game.state.opponent_history, results)
+    for i, (ai_move, opponent_move, result) in enumerate(rounds_played):
+        if result == 1:
+            wins += 1
+        cumulative_win_pct = wins / (i + 1) * 100
+        
+        yield (f"Round {i+1}:\n"
+               f"AI played: {RPSLSState.MOVES[ai_move]}\n"
+               f"Opponent played: {RPSLSState.MOVES[opponent_move]}\n"
+               f"Result: {'Win' if result == 1 else 'Loss' if result == -1 else 'Draw'}\n"
+               f"Cumulative Win Percentage: {cumulative_win_pct:.2f}%\n"
+               "\n")
+
+def run_rounds(game: RPSLSGame, rounds: int, 
+               opponent_strategy: str = "random", 
+               custom_moves: List[int] = None) -> array:
+    """Plays the given number of rounds and returns the AI's results"""
+    play_move = game.play_move
+    opponent_moves = game.get_opponent_moves(rounds, opponent_strategy, 
+                                             custom_moves)
+    results = array('b', bytes(rounds))
+    for i, opponent_move in enumerate(opponent_moves):
+        results[i] = play_move(opponent_move)[2]
+    return results
+
 def demonstrate_game(rounds: int = 10, 
                     opponent_strategy: str = "cycling", 
-                    custom_moves: List[str] = None):
+                    custom_moves: List[str] = None,
+                    verbose: bool = True):
     game = RPSLSGame()
-    results = []
-    wins = 0
+    # Moves are played as indices; names are only used for display
+    if custom_moves:
+        custom_moves = [MOVE_IDX[move] for move in custom_moves]
     
     print(f"Playing against a {opponent_strategy} opponent...")
     
-    for i in range(rounds):
-        ai_move, opponent_move, result = game.play_round(opponent_strategy, 
-                                                        custom_moves, i)
-        results.append(result)
-        if result == 1:
-            wins += 1
-        cumulative_win_pct = wins / (i + 1) * 100
-        
-        print(f"Round {i+1}:")
-        print(f"AI played: {ai_move}")
-        print(f"Opponent played: {opponent_move}")
-        print(f"Result: {'Win' if result == 1 else 'Loss' if result == -1 else 'Draw'}")
-        print(f"Cumulative Win Percentage: {cumulative_win_pct:.2f}%")
-        print()
+    results = run_rounds(game, rounds, opponent_strategy, custom_moves)
+    if verbose:
+        # Written in one go rather than five prints per round
+        sys.stdout.write(''.join(_round_lines(game, results)))
     
     total_wins = results.count(1)
     draws = results.count(0)